@@ -4,18 +4,32 @@
 #   pandas==2.2.2
 #   altair==5.3.0
 #   requests==2.32.3
+#   urllib3>=2
+#   streamlit-autorefresh==1.0.1
+#   orjson
 #
 # Run:
-#   pip install -r <(printf "streamlit==1.36.0\npandas==2.2.2\naltair==5.3.0\nrequests==2.32.3\n")
+#   pip install -r <(printf "streamlit==1.36.0\npandas==2.2.2\naltair==5.3.0\nrequests==2.32.3\nurllib3>=2\nstreamlit-autorefresh==1.0.1\norjson\n")
 #   streamlit run app.py
 
+import hashlib
+import os
+import tempfile
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
 import altair as alt
+import numpy as np
+import orjson
 import pandas as pd
 import requests
 import streamlit as st
+from requests.adapters import HTTPAdapter
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from streamlit_autorefresh import st_autorefresh
+from urllib3.util.retry import Retry
 
 # ---------------- CONFIG ----------------
 st.set_page_config(page_title="Multi-Index OI Dashboard", layout="wide")
@@ -28,23 +42,53 @@ INDEX_NAME_MAP = {
     "FINNIFTY": "NIFTY FIN SERVICE",
     "MIDCPNIFTY": "NIFTY MIDCAP SELECT",
 }
+_EMPTY = {}  # shared read-only stand-in for a missing CE/PE leg
+OC_COLS = ["strike", "ce_oi", "pe_oi", "ce_chg_oi", "pe_chg_oi"]
+INDICES_TTL = 20  # s before all-indices is revalidated
+CHAIN_TTL = 25  # s before an option chain is revalidated
+SWR_GRACE = 5  # s past ttl a value may be served stale; kept below the shortest refresh interval
+SWR_MAX_STALE = 300  # s a last good value may stand in for failing fetches
+FOOTER = "Data: NSE public endpoints • This is for informational purposes only."
+HIST_LEN = 300  # points kept per symbol
+HIST_PATH = os.path.join(".cache", "hist.parquet")
+HIST_TTL = 12 * 3600  # ignore a persisted history older than this (s)
+HIST_FLUSH_EVERY = 30  # appends between disk writes
+NSE_HOME = "https://www.nseindia.com/"
+ALL_INDICES_URL = NSE_HOME + "api/allIndices"
+OPTION_CHAIN_URL = NSE_HOME + "api/option-chain-indices"
 HEADERS = {
     "User-Agent": "Mozilla/5.0",
     "Accept": "application/json",
-    "Referer": "https://www.nseindia.com/",
+    "Accept-Encoding": "gzip, deflate",
+    "Referer": NSE_HOME,
 }
 
 # ---------------- UTIL ----------------
+# Streamlit re-executes this module on every rerun, so the pinned value resets per run
+_NOW = [None]
+
 def ist_now() -> datetime:
-    return datetime.utcnow() + timedelta(hours=5, minutes=30)
+    # one timestamp per run: every tile's history point shares the same instant
+    if _NOW[0] is None:
+        _NOW[0] = datetime.utcnow() + timedelta(hours=5, minutes=30)
+    return _NOW[0]
+
+IST_OFFSET = 19800  # +05:30 in seconds
+MARKET_OPEN_S = 9 * 3600 + 15 * 60  # 09:15 IST, seconds into the day
+MARKET_CLOSE_S = 15 * 3600 + 30 * 60  # 15:30 IST
 
 def market_open() -> bool:
-    n = ist_now()
-    return n.weekday() < 5 and n.replace(hour=9, minute=15, second=0, microsecond=0) <= n <= n.replace(hour=15, minute=30, second=0, microsecond=0)
+    day, secs = divmod(time.time() + IST_OFFSET, 86400)
+    weekday = (int(day) + 3) % 7  # 1970-01-01 was a Thursday; Monday == 0
+    return weekday < 5 and MARKET_OPEN_S <= secs <= MARKET_CLOSE_S
+
+_FMT = [f"{{:.{n}f}}".format for n in range(5)]  # formatters pre-bound per decimal count
 
 def fmt(x, nd=2):
     if x is None:
         return "—"
+    if isinstance(x, (int, float)) and nd < len(_FMT):
+        return _FMT[nd](x)
     try:
         return f"{float(x):.{nd}f}"
     except Exception:
@@ -55,28 +99,123 @@ def fmt(x, nd=2):
 def get_session() -> requests.Session:
     s = requests.Session()
     s.headers.update(HEADERS)
+    # pooled keep-alive connections; transient 5xx / socket errors retried with jittered
+    # exponential backoff. Retry-After is ignored so a rerun never sleeps for an
+    # unbounded server-chosen delay; a 429 is not retried and SWR serves the last good value
+    retry = Retry(
+        total=3,
+        backoff_factor=0.3,
+        backoff_jitter=0.2,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET"]),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    s.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retry))
     try:
-        s.get("https://www.nseindia.com/", timeout=6)
+        s.get(NSE_HOME, timeout=6)
     except Exception:
         pass
     return s
 
+@st.cache_resource(show_spinner=False)
+def validator_store() -> dict:
+    # {(url, params): (etag, last_modified, parsed payload)} for conditional GETs
+    return {}
+
 def get_json(url, params=None):
-    s = get_session()
-    for _ in range(3):
+    key = (url, tuple(sorted((params or {}).items())))
+    store = validator_store()
+    for attempt in range(2):
+        prev = store.get(key)
+        headers = {}
+        if prev:
+            if prev[0]:
+                headers["If-None-Match"] = prev[0]
+            if prev[1]:
+                headers["If-Modified-Since"] = prev[1]
         try:
-            r = s.get(url, params=params, timeout=8)
+            r = get_session().get(url, params=params, headers=headers, timeout=8)
+            if r.status_code == 304 and prev:
+                return prev[2]  # unchanged upstream: skip the download and the parse
             if r.status_code == 200:
-                return r.json()
+                data = orjson.loads(r.content)
+                etag, modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+                if etag or modified:
+                    store[key] = (etag, modified, data)
+                return data
         except Exception:
-            time.sleep(0.4)
+            return {}
+        if r.status_code not in (401, 403) or attempt:
+            break
+        # NSE cookies expired: drop the shared session and re-warm it once
+        get_session().close()  # release the old pool's keep-alive sockets
+        get_session.clear()
     return {}
 
 # ---------------- DATA ----------------
-@st.cache_data(ttl=20, show_spinner=False)
-def fetch_all_indices():
-    url = "https://www.nseindia.com/api/allIndices"
-    data = get_json(url)
+@st.cache_resource(show_spinner=False)
+def swr_store() -> dict:
+    # process-wide: {key: (value, fetched_at, failed_at)} shared by every session;
+    # fetched_at is None when value is a failed result with no good value behind it
+    return {"lock": threading.Lock(), "entries": {}, "inflight": set()}
+
+# stale-while-revalidate: serve the cached value while it is fresh (< ttl), or briefly
+# stale (< ttl + SWR_GRACE) while one background thread refreshes it; anything older is
+# refetched inline so a refresh tick never shows the previous tick's data. A failed fetch
+# is remembered for ttl (no refetch storm across sessions) and keeps the last good value
+# for up to SWR_MAX_STALE. Returns (value, age in s, or None when no good value is held).
+def swr(ttl, fn, *args, ok=bool):
+    store = swr_store()
+    key = (fn.__name__, args)
+    with store["lock"]:
+        ent = store["entries"].get(key)
+    now = time.time()
+    val, fetched_at, failed_at = ent if ent else (None, None, None)
+    age = now - fetched_at if fetched_at is not None else None
+    if failed_at is not None and now - failed_at < ttl:
+        return val, age  # backing off after a failure
+    if age is None or age > ttl + SWR_GRACE:
+        new = fn(*args)
+        now = time.time()
+        if ok(new):
+            with store["lock"]:
+                store["entries"][key] = (new, now, None)
+            return new, 0.0
+        if age is not None and now - fetched_at <= SWR_MAX_STALE:
+            ent = (val, fetched_at, now)
+        else:
+            ent, age = (new, None, now), None
+        with store["lock"]:
+            store["entries"][key] = ent
+        return ent[0], age
+    if age > ttl:
+        with store["lock"]:
+            start = key not in store["inflight"]
+            store["inflight"].add(key)
+        if start:
+            def refresh():
+                try:
+                    new = fn(*args)
+                    with store["lock"]:
+                        if ok(new):
+                            store["entries"][key] = (new, time.time(), None)
+                        else:
+                            store["entries"][key] = (val, fetched_at, time.time())
+                finally:
+                    with store["lock"]:
+                        store["inflight"].discard(key)
+            t = threading.Thread(target=refresh, daemon=True)
+            add_script_run_ctx(t)
+            t.start()
+    return val, age
+
+def stale_warning(what: str, age, ttl):
+    if age is not None and age > ttl + SWR_GRACE:
+        st.warning(f"NSE fetch failing — {what} data is {int(age)} s old; retrying.")
+
+def load_all_indices():
+    data = get_json(ALL_INDICES_URL)
     out = {}
     for row in data.get("data", []):
         nm = row.get("index")
@@ -90,64 +229,102 @@ def fetch_all_indices():
         }
     return out
 
-@st.cache_data(ttl=25, show_spinner=False)
-def fetch_option_chain(symbol: str):
-    url = "https://www.nseindia.com/api/option-chain-indices"
-    data = get_json(url, params={"symbol": symbol})
+def load_option_chain(symbol: str):
+    data = get_json(OPTION_CHAIN_URL, params={"symbol": symbol})
     rec = data.get("records", {})
     under = rec.get("underlyingValue")
     rows = rec.get("data", [])
     if not rows:
-        return under, pd.DataFrame(columns=["strike","ce_oi","pe_oi","ce_chg_oi","pe_chg_oi"])
-    df = pd.DataFrame([
+        return under, pd.DataFrame(columns=OC_COLS)
+    n = len(rows)
+    strike, ce_oi, pe_oi, ce_chg, pe_chg = [None] * n, [0] * n, [0] * n, [0] * n, [0] * n
+    for i, r in enumerate(rows):
+        ce = r.get("CE") or _EMPTY
+        pe = r.get("PE") or _EMPTY
+        strike[i] = r.get("strikePrice")
+        ce_oi[i] = ce.get("openInterest", 0) or 0
+        pe_oi[i] = pe.get("openInterest", 0) or 0
+        ce_chg[i] = ce.get("changeinOpenInterest", 0) or 0
+        pe_chg[i] = pe.get("changeinOpenInterest", 0) or 0
+    s = np.array(strike, dtype=np.float64)  # missing strikePrice -> NaN
+    keep = ~np.isnan(s)
+    # OI and strikes fit in int32; halves the bytes every reduction walks
+    df = pd.DataFrame(
         {
-            "strike": r.get("strikePrice"),
-            "ce_oi": (r.get("CE") or {}).get("openInterest", 0) or 0,
-            "pe_oi": (r.get("PE") or {}).get("openInterest", 0) or 0,
-            "ce_chg_oi": (r.get("CE") or {}).get("changeinOpenInterest", 0) or 0,
-            "pe_chg_oi": (r.get("PE") or {}).get("changeinOpenInterest", 0) or 0,
-        }
-        for r in rows
-    ])
-    df = df.dropna(subset=["strike"]).sort_values("strike").reset_index(drop=True)
+            "strike": s[keep].astype(np.int32),
+            "ce_oi": np.asarray(ce_oi, np.int32)[keep],
+            "pe_oi": np.asarray(pe_oi, np.int32)[keep],
+            "ce_chg_oi": np.asarray(ce_chg, np.int32)[keep],
+            "pe_chg_oi": np.asarray(pe_chg, np.int32)[keep],
+        },
+        copy=False,
+    )
+    # NSE already returns the ladder in strike order; only sort when it doesn't
+    if not df["strike"].is_monotonic_increasing:
+        df = df.sort_values("strike", kind="stable", ignore_index=True)
     return under, df
 
+def fetch_all_indices():
+    return swr(INDICES_TTL, load_all_indices)
+
+def fetch_option_chain(symbol: str):
+    return swr(CHAIN_TTL, load_option_chain, symbol, ok=lambda v: not v[1].empty)
+
 # ---------------- METRICS ----------------
-def pcr(df: pd.DataFrame):
+def oc_sums(df: pd.DataFrame):
+    # (ce_oi, pe_oi, ce_chg_oi, pe_chg_oi) totals in one sweep
     if df.empty:
-        return None
-    ce = float(df["ce_oi"].sum())
-    pe = float(df["pe_oi"].sum())
+        return (0.0, 0.0, 0.0, 0.0)
+    a = df[["ce_oi", "pe_oi", "ce_chg_oi", "pe_chg_oi"]].to_numpy()
+    return tuple(float(x) for x in a.sum(axis=0))
+
+def pcr(sums):
+    ce, pe = sums[0], sums[1]
     return (pe / ce) if ce else None
 
 def max_pain(df: pd.DataFrame):
     if df.empty:
         return None
-    strikes = df["strike"].astype(float).values.tolist()
-    ce = df["ce_oi"].astype(float).values
-    pe = df["pe_oi"].astype(float).values
-    pains = []
-    for s in strikes:
-        pain = ((df["strike"].astype(float) - s).clip(lower=0).values * ce).sum() + ((s - df["strike"].astype(float)).clip(lower=0).values * pe).sum()
-        pains.append(pain)
-    if not pains:
-        return None
-    idx = pains.index(min(pains))
-    return strikes[idx]
+    # pain(k) = sum ce * max(s - k, 0) + sum pe * max(k - s, 0), evaluated at every strike
+    # from prefix sums over the sorted ladder: O(N log N) time, O(N) memory. records.data
+    # spans every expiry, so N runs into the thousands. OI and strikes are integers, so the
+    # int64 sums are exact.
+    s = df["strike"].to_numpy(np.int64)
+    ce = df["ce_oi"].to_numpy(np.int64)
+    pe = df["pe_oi"].to_numpy(np.int64)
+    order = np.argsort(s, kind="stable")
+    ss, c, p = s[order], ce[order], pe[order]
+    zero = np.zeros(1, np.int64)
+    C = np.concatenate((zero, np.cumsum(c)))
+    CS = np.concatenate((zero, np.cumsum(c * ss)))
+    P = np.concatenate((zero, np.cumsum(p)))
+    PS = np.concatenate((zero, np.cumsum(p * ss)))
+    i = np.searchsorted(ss, s, side="right")  # rows with strike <= k
+    pains = (CS[-1] - CS[i]) - s * (C[-1] - C[i]) + s * P[i] - PS[i]
+    return float(s[pains.argmin()])
+
+def top_strikes(strikes, oi, k):
+    # O(N) partition finds the k-th largest OI; every row at or above it is a candidate,
+    # and a stable sort keeps first-row-wins ties, matching nlargest(keep="first")
+    if len(oi) > k:
+        thr = oi[np.argpartition(oi, -k)[-k]]
+        cand = np.flatnonzero(oi >= thr)
+    else:
+        cand = np.arange(len(oi))
+    idx = cand[np.argsort(-oi[cand], kind="stable")][:k]
+    return strikes[idx].astype(float).tolist()
 
 def sr_levels(df: pd.DataFrame, k=3):
     if df.empty:
         return [], []
-    sup = df.nlargest(k, "pe_oi")["strike"].astype(float).tolist()
-    res = df.nlargest(k, "ce_oi")["strike"].astype(float).tolist()
+    s = df["strike"].to_numpy()
+    sup = top_strikes(s, df["pe_oi"].to_numpy(np.int64), k)
+    res = top_strikes(s, df["ce_oi"].to_numpy(np.int64), k)
     return sup, res
 
-def bias_engine(under, prev, df: pd.DataFrame):
-    if df.empty:
-        return "Sideways"
-    ce_d = float(df["ce_chg_oi"].sum())
-    pe_d = float(df["pe_chg_oi"].sum())
-    pc = pcr(df) or 0
+def bias_engine(under, prev, sums):
+    _, _, ce_d, pe_d = sums
+    pc = pcr(sums) or 0
     if under and prev:
         if under > prev and pe_d > 0 and ce_d <= 0 and pc > 0.9:
             return "Strong Buy CE"
@@ -159,28 +336,137 @@ def bias_engine(under, prev, df: pd.DataFrame):
             return "Sell CE"
     return "Sideways"
 
+# ---------------- CHARTS ----------------
+def oi_spec(cols, labels, value, title) -> dict:
+    # hand-written Vega-Lite: CE/PE columns are folded client-side, and the frame is
+    # passed to st.vega_lite_chart separately so no Altair objects are built per rerun
+    return {
+        "config": {"background": "white"},
+        "transform": [
+            {"fold": list(cols), "as": ["type", value]},
+            {"calculate": f"datum.type == '{cols[0]}' ? '{labels[0]}' : '{labels[1]}'", "as": "type"},
+        ],
+        "mark": {"type": "bar"},
+        "encoding": {
+            "x": {"field": "strike", "type": "quantitative", "title": "Strike"},
+            "y": {"field": value, "type": "quantitative", "title": title},
+            "color": {"field": "type", "type": "nominal", "scale": {"scheme": "tableau10"}},
+            "tooltip": [
+                {"field": "type", "type": "nominal"},
+                {"field": "strike", "type": "quantitative"},
+                {"field": value, "type": "quantitative"},
+            ],
+        },
+        "height": 340,
+    }
+
+VL_OI = oi_spec(("ce_oi", "pe_oi"), ("CE", "PE"), "oi", "Open Interest")
+VL_CHG = oi_spec(("ce_chg_oi", "pe_chg_oi"), ("CE ΔOI", "PE ΔOI"), "chg", "Change in OI")
+
+def df_key(df: pd.DataFrame) -> str:
+    h = pd.util.hash_pandas_object(df, index=False).values.tobytes()
+    return hashlib.blake2b(h, digest_size=8).hexdigest()
+
+@st.cache_resource(max_entries=16, show_spinner=False)
+def chain_view(key: str, _df: pd.DataFrame):
+    # keyed on the chain's content hash; reruns with an unchanged chain skip the metrics
+    sup, res = sr_levels(_df)
+    sums = oc_sums(_df)
+    return {
+        "sums": sums,
+        "pcr": pcr(sums),
+        "max_pain": max_pain(_df),
+        "sup": sup,
+        "res": res,
+    }
+
 # ---------------- STATE ----------------
+# per-symbol LTP history: two preallocated arrays used as a ring buffer plus a write count
+def new_buf() -> dict:
+    return {"t": np.empty(HIST_LEN, "datetime64[s]"), "v": np.empty(HIST_LEN, np.float64), "n": 0}
+
+def buf_push(buf: dict, ts, v: float):
+    i = buf["n"] % HIST_LEN
+    buf["t"][i] = ts
+    buf["v"][i] = v
+    buf["n"] += 1
+
+def buf_last(buf: dict):
+    n = buf["n"]
+    return float(buf["v"][(n - 1) % HIST_LEN]) if n else None
+
+def buf_view(buf: dict):
+    # oldest-first (times, values); a zero-copy slice until the buffer wraps
+    n, t, v = buf["n"], buf["t"], buf["v"]
+    if n <= HIST_LEN:
+        return t[:n], v[:n]
+    i = n % HIST_LEN
+    return np.concatenate((t[i:], t[:i])), np.concatenate((v[i:], v[:i]))
+
+def load_hist() -> dict:
+    try:
+        if time.time() - os.path.getmtime(HIST_PATH) > HIST_TTL:
+            return {}
+        h = pd.read_parquet(HIST_PATH)
+    except Exception:
+        return {}
+    out = {}
+    for sym, g in h.groupby("sym", sort=False):
+        g = g.tail(HIST_LEN)
+        buf = out[sym] = new_buf()
+        n = len(g)
+        buf["t"][:n] = g["time"].to_numpy("datetime64[s]")
+        buf["v"][:n] = g["ltp"].to_numpy(np.float64)
+        buf["n"] = n
+    return out
+
+def save_hist(hist: dict):
+    parts = []
+    for sym, buf in hist.items():
+        t, v = buf_view(buf)
+        if len(t):
+            parts.append(pd.DataFrame({"sym": sym, "time": t, "ltp": v}))
+    if not parts:
+        return
+    tmp = None
+    try:
+        d = os.path.dirname(HIST_PATH)
+        os.makedirs(d, exist_ok=True)
+        # unique temp file per writer so concurrent sessions never share one half-written file
+        fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+        os.close(fd)
+        pd.concat(parts, ignore_index=True).to_parquet(tmp, compression="zstd", index=False)
+        os.replace(tmp, HIST_PATH)
+    except Exception:
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+
 if "symbol" not in st.session_state:
     st.session_state.symbol = "BANKNIFTY"
 if "hist" not in st.session_state:
-    st.session_state.hist = {}  # {sym: [(ts, ltp), ...]}
+    st.session_state.hist = load_hist()  # {sym: new_buf()}
+    st.session_state.hist_appends = 0
 if "levels" not in st.session_state:
     st.session_state.levels = {}  # {sym: {"sup": [], "res": []}}
 
 def update_hist(sym: str, ltp):
     if ltp is None:
         return
-    hist = st.session_state.hist.setdefault(sym, [])
-    if not hist or hist[-1][1] != ltp:
-        hist.append((ist_now(), float(ltp)))
-    if len(hist) > 300:
-        st.session_state.hist[sym] = hist[-300:]
+    buf = st.session_state.hist.get(sym)
+    if buf is None:
+        buf = st.session_state.hist[sym] = new_buf()
+    if buf_last(buf) != float(ltp):
+        buf_push(buf, ist_now(), float(ltp))
+        st.session_state.hist_appends += 1
+        if st.session_state.hist_appends % HIST_FLUSH_EVERY == 0:
+            save_hist(st.session_state.hist)
 
 def hist_df(sym: str) -> pd.DataFrame:
-    h = st.session_state.hist.get(sym, [])
-    if not h:
+    buf = st.session_state.hist.get(sym)
+    if buf is None or not buf["n"]:
         return pd.DataFrame(columns=["time", "ltp"])
-    return pd.DataFrame(h, columns=["time", "ltp"])
+    t, v = buf_view(buf)
+    return pd.DataFrame({"time": t, "ltp": v}, copy=False)
 
 # ---------------- HEADER ----------------
 left, right = st.columns([0.75, 0.25])
@@ -191,18 +477,21 @@ with left:
 with right:
     auto = st.toggle("Auto-refresh", True)
     secs = st.selectbox("Interval (s)", [10, 20, 30, 60], index=1, key="refresh_interval")
-    # Lightweight client-side refresh to keep layout stable
+    # Timer-driven rerun over the existing websocket: no page reload, session state survives
     if auto:
-        st.markdown(
-            f"<meta http-equiv='refresh' content='{int(secs)}'>",
-            unsafe_allow_html=True,
-        )
+        st_autorefresh(interval=int(secs) * 1000, key="tick")
 
 if not market_open():
     st.info("Market closed (IST) — data may be static.")
 
 # ---------------- TILES ----------------
-all_idx = fetch_all_indices()
+# the two endpoints are independent; fetch them concurrently (I/O releases the GIL)
+prefetch_sym = st.session_state.symbol
+with ThreadPoolExecutor(max_workers=2, initializer=add_script_run_ctx, initargs=(None, get_script_run_ctx())) as ex:
+    f_idx = ex.submit(fetch_all_indices)
+    f_oc = ex.submit(fetch_option_chain, prefetch_sym)
+all_idx, idx_age = f_idx.result()
+stale_warning("index", idx_age, INDICES_TTL)
 tcols = st.columns(len(INDICES))
 clicked = None
 
@@ -248,13 +537,21 @@ st.markdown("---")
 st.markdown(f"### {sel}")
 
 # ---------------- DETAIL ----------------
-under, df = fetch_option_chain(sel)
+(under, df), oc_age = f_oc.result() if sel == prefetch_sym else fetch_option_chain(sel)
 idx_info = all_idx.get(INDEX_NAME_MAP[sel], {}) or {}
 prev_close = idx_info.get("prevClose")
 
-bias = bias_engine(under, prev_close, df)
-pc = pcr(df)
-mp = max_pain(df)
+if under is None and df.empty:
+    # nothing came back (e.g. NSE rejected the cookies): skip the metrics, charts and levels
+    st.warning(f"Option chain for {sel} is unavailable right now — retrying on the next refresh.")
+    st.caption(FOOTER)
+    st.stop()
+stale_warning(f"{sel} option chain", oc_age, CHAIN_TTL)
+
+view = chain_view(df_key(df), df)
+bias = bias_engine(under, prev_close, view["sums"])
+pc = view["pcr"]
+mp = view["max_pain"]
 
 m1, m2, m3, m4, m5 = st.columns(5)
 with m1:
@@ -278,55 +575,19 @@ with tab1:
     if df.empty:
         st.warning("No option chain data available.")
     else:
-        long = df.melt(
-            id_vars=["strike"],
-            value_vars=["ce_oi", "pe_oi"],
-            var_name="type",
-            value_name="oi",
-        )
-        long["type"] = long["type"].map({"ce_oi": "CE", "pe_oi": "PE"})
-        chart = (
-            alt.Chart(long)
-            .mark_bar()
-            .encode(
-                x=alt.X("strike:Q", title="Strike"),
-                y=alt.Y("oi:Q", title="Open Interest"),
-                color=alt.Color("type:N", scale=alt.Scale(scheme="tableau10")),
-                tooltip=["type", "strike", "oi"],
-            )
-            .properties(height=340)
-        )
-        st.altair_chart(chart, use_container_width=True)
+        st.vega_lite_chart(df, VL_OI, use_container_width=True)
 
 with tab2:
     if df.empty:
         st.warning("No option chain data available.")
     else:
-        long = df.melt(
-            id_vars=["strike"],
-            value_vars=["ce_chg_oi", "pe_chg_oi"],
-            var_name="type",
-            value_name="chg",
-        )
-        long["type"] = long["type"].map({"ce_chg_oi": "CE ΔOI", "pe_chg_oi": "PE ΔOI"})
-        chart = (
-            alt.Chart(long)
-            .mark_bar()
-            .encode(
-                x=alt.X("strike:Q", title="Strike"),
-                y=alt.Y("chg:Q", title="Change in OI"),
-                color=alt.Color("type:N", scale=alt.Scale(scheme="tableau10")),
-                tooltip=["type", "strike", "chg"],
-            )
-            .properties(height=340)
-        )
-        st.altair_chart(chart, use_container_width=True)
+        st.vega_lite_chart(df, VL_CHG, use_container_width=True)
 
 with tab3:
     if df.empty:
         st.info("Awaiting data to compute S/R levels.")
     else:
-        sup, res = sr_levels(df)
+        sup, res = view["sup"], view["res"]
         prev_levels = st.session_state.levels.get(sel, {"sup": [], "res": []})
         new_sup = [s for s in sup if s not in prev_levels["sup"]]
         new_res = [r for r in res if r not in prev_levels["res"]]
@@ -346,4 +607,4 @@ with tab3:
         st.session_state.levels[sel] = {"sup": sup, "res": res}
 
 # ---------------- FOOTER ----------------
-st.caption("Data: NSE public endpoints • This is for informational purposes only.")
+st.caption(FOOTER)